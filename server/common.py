@@ -0,0 +1,95 @@
+"""Config and client setup shared by the API server (main.py) and the scrape worker (worker.py)."""
+import hashlib
+import os
+
+import httpx
+import orjson
+import redis.asyncio as redis
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+from dotenv import load_dotenv
+
+# ---------------- Load environment variables ----------------
+load_dotenv()  # Load .env file for secrets and config
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")  # Service role key
+CACHE_TTL = int(os.getenv("CACHE_TTL", 3600))  # Cache duration for DB results
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", 3))  # Baseline scrape concurrency
+JOB_TTL = int(os.getenv("JOB_TTL", 3600))  # Time-to-live for job records in Redis
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")  # Job store and queue
+SUPABASE_TIMEOUT = int(os.getenv("SUPABASE_TIMEOUT", 10))  # Seconds before a Supabase call gives up
+
+if not SUPABASE_URL or not SUPABASE_KEY:
+    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env")
+
+# ---------------- Supabase client ----------------
+# Keep-alive pool shared by all DB calls so requests reuse warm TCP+TLS connections;
+# HTTP/2 additionally multiplexes concurrent calls over a single connection
+HTTP_POOL_LIMITS = httpx.Limits(max_keepalive_connections=64, max_connections=128, keepalive_expiry=60)
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create the process-wide pooled HTTP client. The caller owns it and must aclose() it;
+    the Supabase client only borrows it (see create_supabase_client).
+    """
+    return httpx.AsyncClient(
+        timeout=SUPABASE_TIMEOUT,
+        limits=HTTP_POOL_LIMITS,
+        http2=True,
+        follow_redirects=True,  # Matches the session postgrest builds by default
+    )
+
+async def create_supabase_client(http_client: httpx.AsyncClient) -> AsyncClient:
+    """
+    Create the async Supabase client on top of the shared pooled http_client.
+    Passed via options, so postgrest clients recreated on auth events reuse the same pool.
+    """
+    return await acreate_client(
+        SUPABASE_URL,
+        SUPABASE_KEY,
+        options=AsyncClientOptions(httpx_client=http_client),
+    )
+
+# ---------------- Job Store ----------------
+# Jobs live in Redis so the API can enqueue and report on them while worker.py runs them:
+#   job:{job_id} -> hash {"status", "result" (JSON), "etag" (result digest), "created" (Unix time)},
+#                   expires after JOB_TTL
+#   jobq         -> list of "{job_id}|{username}" entries (LPUSH to enqueue, BLMOVE to dequeue)
+#   jobq:processing:{worker_id} -> entries a worker has taken and not finished; moved back to
+#                                  jobq if the worker dies (its heartbeat key expires)
+#   worker:{worker_id} -> heartbeat key of a live worker, refreshed well within its TTL
+#   pending:{username} -> job_id of the user's in-flight job, shared by concurrent /fetch calls;
+#                         kept until the job's result is saved to Supabase
+JOB_QUEUE_KEY = "jobq"
+PROCESSING_KEY_PREFIX = "jobq:processing:"
+
+def create_redis_client() -> redis.Redis:
+    """Create the Redis client; call inside the running event loop."""
+    return redis.from_url(REDIS_URL, decode_responses=True)
+
+def job_key(job_id: str) -> str:
+    """Redis key of a job's metadata hash."""
+    return f"job:{job_id}"
+
+def processing_key(worker_id: str) -> str:
+    """Redis list of the entries a worker is currently running."""
+    return f"{PROCESSING_KEY_PREFIX}{worker_id}"
+
+def worker_key(worker_id: str) -> str:
+    """Redis heartbeat key that exists while a worker is alive."""
+    return f"worker:{worker_id}"
+
+def pending_key(username: str) -> str:
+    """Redis key holding the job_id of a username's in-flight job."""
+    return f"pending:{username}"
+
+async def set_job(redis_client: redis.Redis, job_id: str, **fields):
+    """Update a job's hash and (re)arm its TTL so records never outlive JOB_TTL without updates."""
+    if "result" in fields:
+        fields["result"] = orjson.dumps(fields["result"])
+        # Digest computed once here so /result can answer conditional requests without re-hashing
+        fields["etag"] = f'"{hashlib.blake2b(fields["result"], digest_size=16).hexdigest()}"'
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(job_key(job_id), mapping=fields)
+        pipe.expire(job_key(job_id), JOB_TTL)
+        await pipe.execute()
@@ -1,52 +1,69 @@
 import asyncio
+import functools
+import heapq
 import re
+import secrets
 import time
-import uuid
 import os
 import base64
 from datetime import datetime, timezone
-from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from collections import defaultdict, deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import signal
-import html
+import string
 
 from fastapi import FastAPI, Request, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-from utils.scrape_tweets import scrape_tweets
-
-# ---------------- Load environment variables ----------------
-load_dotenv()  # Load .env file for secrets and config
+import anyio
+from cachetools import TTLCache
+import httpx
+import orjson
+import redis.asyncio as redis
+from supabase import AsyncClient
+
+from common import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    CACHE_TTL,
+    WORKER_COUNT,
+    JOB_TTL,
+    REDIS_URL,
+    JOB_QUEUE_KEY,
+    create_http_client,
+    create_supabase_client,
+    create_redis_client,
+    job_key,
+    pending_key,
+)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")  # Service role key
-CACHE_TTL = int(os.getenv("CACHE_TTL", 3600))  # Cache duration for DB results
-WORKER_COUNT = int(os.getenv("WORKER_COUNT", 3))  # Background worker count
-JOB_TTL = int(os.getenv("JOB_TTL", 3600))  # Time-to-live for jobs in memory
+# ---------------- Server config ----------------
+QUEUE_MAX = int(os.getenv("QUEUE_MAX", WORKER_COUNT * 4))  # Max queued jobs before /fetch pushes back with 503
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", REDIS_URL)  # Shared rate-limit counters
 SUPABASE_IMAGE_PUBLIC_BASE = os.getenv("SUPABASE_IMAGE_PUBLIC_BASE")
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", 16))  # Threads for blocking work offloaded from the event loop
+STARLETTE_THREAD_LIMIT = int(os.getenv("STARLETTE_THREAD_LIMIT", 64))  # anyio threads for sync endpoints/UploadFile I/O
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("SUPABASE_URL and SUPABASE_KEY must be set in .env")
+supabase: AsyncClient = None  # Async client, created on startup inside the running event loop
+http_client: httpx.AsyncClient = None  # Pooled client shared by Supabase and direct HTTP calls (e.g. storage HEAD checks)
 
-# ---------------- Supabase client ----------------
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# ---------------- Blocking Work ----------------
+# Dedicated, explicitly sized pool so CPU/blocking offloads can't starve (or be starved by) other thread users
+BLOCKING_EXECUTOR = ThreadPoolExecutor(max_workers=THREAD_POOL_SIZE, thread_name_prefix="blocking")
 
-async def db_execute(func, *args, **kwargs):
-    """
-    Execute blocking Supabase SDK calls in a thread pool.
-    Prevents blocking the main asyncio event loop.
-    """
-    return await asyncio.to_thread(func, *args, **kwargs)
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking call on BLOCKING_EXECUTOR without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(BLOCKING_EXECUTOR, functools.partial(func, *args, **kwargs))
 
 # ---------------- FastAPI setup ----------------
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)  # orjson encodes responses in C
 
 # Enable Cross-Origin Resource Sharing
 app.add_middleware(
@@ -58,17 +75,30 @@ app.add_middleware(
 )
 
 # ---------------- Rate Limiter ----------------
-limiter = Limiter(key_func=get_remote_address, default_limits=["5/minute"])
+# Counters live in Redis so limits hold across processes/replicas; moving-window enforces a true rolling window.
+# Accepted cost: slowapi only drives the synchronous `limits` strategies (an async+redis:// storage
+# would not work), so each rate-limited request makes one blocking Redis round trip on the event
+# loop, typically well under a millisecond against a nearby Redis. Set RATE_LIMIT_STORAGE_URI=memory://
+# to keep counters in-process instead, at the cost of per-process limits.
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["5/minute"],
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy="moving-window",
+)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # ---------------- IP Ban / Abuse Prevention ----------------
-banned_ips = {}
-ip_hits = defaultdict(list)
-
 BAN_THRESHOLD = 20  # Max requests within BAN_WINDOW
 BAN_WINDOW = 60     # Seconds window
 BAN_DURATION = 600  # Ban duration in seconds
+BAN_SKIP_PATHS = frozenset({"/ready", "/health"})  # Probe endpoints exempt from ban tracking
+
+banned_ips = {}
+ban_expiry_heap = []  # (ban_expires, ip) min-heap so cleanup only touches bans that have expired
+# Recent hit timestamps per IP, oldest first; bounded since only BAN_THRESHOLD + 1 hits matter
+ip_hits = defaultdict(lambda: deque(maxlen=BAN_THRESHOLD + 2))
 
 def get_client_ip(request: Request):
     """Return the client IP for rate-limiting / banning."""
@@ -80,13 +110,17 @@ async def block_banned_ips(request: Request, call_next):
     Middleware to block abusive IPs.
     Tracks request timestamps and bans IPs exceeding the threshold.
     """
+    # Health/readiness probes skip ban tracking entirely
+    if request.url.path in BAN_SKIP_PATHS:
+        return await call_next(request)
+
     client_ip = get_client_ip(request)
 
     # If IP is currently banned
     if client_ip in banned_ips:
         ban_expires = banned_ips[client_ip]
         if time.time() < ban_expires:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=429,
                 content={"error": "Too many requests, try again later."}
             )
@@ -95,13 +129,16 @@ async def block_banned_ips(request: Request, call_next):
 
     # Track request times for IP
     now = time.time()
-    ip_hits[client_ip].append(now)
-    ip_hits[client_ip] = [t for t in ip_hits[client_ip] if now - t < BAN_WINDOW]
+    hits = ip_hits[client_ip]
+    hits.append(now)
+    while hits and now - hits[0] >= BAN_WINDOW:
+        hits.popleft()
 
     # Ban IP if threshold exceeded
-    if len(ip_hits[client_ip]) > BAN_THRESHOLD:
+    if len(hits) > BAN_THRESHOLD:
         banned_ips[client_ip] = now + BAN_DURATION
-        return JSONResponse(
+        heapq.heappush(ban_expiry_heap, (banned_ips[client_ip], client_ip))
+        return ORJSONResponse(
             status_code=429,
             content={"error": f"IP banned for {BAN_DURATION//60} minutes due to abuse"}
         )
@@ -110,11 +147,129 @@ async def block_banned_ips(request: Request, call_next):
     return await call_next(request)
 
 # ---------------- Job Queue ----------------
-job_queue = asyncio.Queue()  # Queue for background scraping jobs
-jobs = {}                     # In-memory job metadata {job_id: {"status": str, "result": dict, "created": datetime}}
-worker_tasks = []             # List of background worker tasks
+# Job records and the queue live in Redis (see common.py); worker.py runs the jobs
+redis_client: redis.Redis = None  # Created on startup inside the running event loop
+worker_tasks = []             # List of long-lived background tasks (IP state cleanup)
+
+async def get_pending_job(username: str):
+    """Return the job_id of username's in-flight job if its record still exists, else None."""
+    pending_job_id = await redis_client.get(pending_key(username))
+    if pending_job_id and await redis_client.exists(job_key(pending_job_id)):
+        return pending_job_id
+    return None
+
+# Claim a username, create its job record and queue it in one atomic step, so no request can
+# ever see a claim without its job, or a job that was never queued. Returns the new job_id,
+# the existing claimant's job_id, or nil (nothing written) if the queue is at QUEUE_MAX.
+# KEYS: pending:{username}, job:{job_id}, jobq   ARGV: job_id, created, JOB_TTL, QUEUE_MAX, entry
+CLAIM_JOB_LUA = """
+local claimant = redis.call('GET', KEYS[1])
+if claimant then
+    return claimant
+end
+if redis.call('LLEN', KEYS[3]) >= tonumber(ARGV[4]) then
+    return false
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('HSET', KEYS[2], 'status', 'queued', 'created', ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('LPUSH', KEYS[3], ARGV[5])
+return ARGV[1]
+"""
+claim_job_script = None  # Registered on startup with the Redis client
+
+# ---------------- In-Process Result Cache ----------------
+MEM_CACHE_MAX = 10_000  # Max usernames kept in the in-process cache
+_mem_cache = OrderedDict()   # {username: (expires_at, result)}, least recently used first
+
+def mem_cache_get(username: str):
+    """Return a fresh cached result for username, or None if absent/expired."""
+    entry = _mem_cache.get(username)
+    if not entry:
+        return None
+    if entry[0] <= time.time():
+        _mem_cache.pop(username, None)
+        return None
+    _mem_cache.move_to_end(username)
+    return entry[1]
+
+def mem_cache_set(username: str, result: dict, expires_at: float):
+    """Store a result in the in-process cache, evicting the least recently used entry when full."""
+    _mem_cache[username] = (expires_at, result)
+    _mem_cache.move_to_end(username)
+    while len(_mem_cache) > MEM_CACHE_MAX:
+        _mem_cache.popitem(last=False)
+
+async def get_updated_at_ts(username: str):
+    """
+    Return the Unix time username's tweet_results row was last updated, or None if missing.
+    Not cached: fresh rows are served from _mem_cache before this is reached, and stale or
+    missing rows can be refreshed by a worker process at any moment.
+    """
+    response = await (
+        supabase.table("tweet_results")
+        .select("last_updated,updated_at_ts")
+        .eq("username", username)
+        .limit(1)
+        .execute()
+    )
+    existing = response.data[0] if response.data else None
+
+    updated_at_ts = None
+    if existing:
+        updated_at_ts = existing.get("updated_at_ts")
+        if updated_at_ts is None:
+            # Rows written before updated_at_ts existed only carry the ISO timestamp
+            last_updated = datetime.fromisoformat(existing["last_updated"])
+            if last_updated.tzinfo is None:
+                last_updated = last_updated.replace(tzinfo=timezone.utc)
+            updated_at_ts = last_updated.timestamp()
+
+    return updated_at_ts
+
+# ---------------- Storage Uploads ----------------
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read from an UploadFile per chunk
+# Last-modified Unix time of each user's heatmap object, so repeat uploads skip the HEAD request
+_heatmap_updated_cache = TTLCache(maxsize=10_000, ttl=CACHE_TTL)
+DATA_URL_CHUNK_SIZE = 1024 * 1024  # Base64 characters decoded per chunk (multiple of 4)
+
+async def iter_upload_file(file: UploadFile):
+    """Yield an uploaded file in chunks so it is never held in memory all at once."""
+    await file.seek(0)
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+async def iter_base64_decoded(encoded: str):
+    """
+    Decode base64 text in fixed-size chunks off the event loop, yielding the bytes as they're ready.
+    Keeps at most one decoded chunk in memory instead of a full decoded copy of the image.
+    Whitespace (e.g. MIME line wrapping) is dropped first so every chunk stays 4-character aligned.
+    """
+    encoded = "".join(encoded.split())
+    for start in range(0, len(encoded), DATA_URL_CHUNK_SIZE):
+        yield await run_blocking(base64.b64decode, encoded[start:start + DATA_URL_CHUNK_SIZE])
+
+async def upload_heatmap_object(path: str, content):
+    """
+    Upload (upsert) a PNG into the heatmaps bucket via the Storage REST API.
+    Accepts bytes or an async byte iterator, which httpx streams as the request body.
+    """
+    response = await http_client.post(
+        f"{SUPABASE_URL}/storage/v1/object/heatmaps/{path}",
+        content=content,
+        headers={
+            "Authorization": f"Bearer {SUPABASE_KEY}",
+            "apikey": SUPABASE_KEY,
+            "x-upsert": "true",
+            "cache-control": "max-age=3600",
+            "content-type": "image/png",
+        },
+    )
+    response.raise_for_status()
 
 # ---------------- Helper Functions ----------------
+USERNAME_REGEX = re.compile(r"^(?!.*\.\.)(?!.*\.$)[A-Za-z0-9_]{1,15}$")
+
 def sanitize_username(input_str: str) -> str:
     """Strip whitespace and remove leading @."""
     username = input_str.strip()
@@ -122,80 +277,58 @@ def sanitize_username(input_str: str) -> str:
         username = username[1:]
     return username
 
-def is_valid_twitter_username(username: str) -> bool:
-    """Validate Twitter username according to Twitter rules."""
-    sanitized_username = sanitize_username(username)
-    username_regex = re.compile(r"^(?!.*\.\.)(?!.*\.$)[A-Za-z0-9_]{1,15}$")
-    return bool(username_regex.match(sanitized_username))
+@functools.lru_cache(maxsize=4096)
+def public_heatmap_url(username: str) -> str:
+    """Public URL of a user's heatmap PNG; a pure function of username, so memoized."""
+    return f"{SUPABASE_IMAGE_PUBLIC_BASE}/{username}.png"
 
-# ---------------- Worker Function ----------------
-async def worker(worker_id: int):
-    """
-    Background worker to process scraping jobs.
-    Each job:
-        - Calls scrape_tweets()
-        - Saves result to Supabase
-        - Updates job status
-    """
-    while True:
-        job_id, username = await job_queue.get()
-        jobs[job_id]["status"] = "fetching"
-        print(f"[Worker {worker_id}] Processing job {job_id} for {username}")
-
-        try:
-            result = await scrape_tweets(username)
+def is_valid_twitter_username(username: str) -> bool:
+    """Validate an already-sanitized Twitter username according to Twitter rules."""
+    return bool(USERNAME_REGEX.match(username))
 
-            if result.get("error"):
-                jobs[job_id]["status"] = "error"
-                jobs[job_id]["result"] = {"error": result.get("error")}
-            else:
-                # Save result to Supabase (upsert)
-                await db_execute(
-                    supabase.table("tweet_results")
-                    .upsert({
-                        "username": username,
-                        "result": result,
-                        "last_updated": datetime.now(timezone.utc).isoformat()
-                    }, on_conflict="username").execute
-                )
-                jobs[job_id]["status"] = "done"
-                jobs[job_id]["result"] = result
-
-        except Exception as e:
-            print(f"[Worker {worker_id}] Error: {e}")
-            jobs[job_id]["status"] = "error"
-            jobs[job_id]["result"] = {"error": str(e)}
-
-        finally:
-            job_queue.task_done()
-
-# ---------------- Job Cleanup ----------------
-async def cleanup_jobs():
-    """Periodically remove expired jobs from memory to prevent unbounded growth."""
+# ---------------- IP State Cleanup ----------------
+async def cleanup_ip_state():
+    """Periodically drop idle IPs and expired bans so abuse-tracking state stays bounded."""
     while True:
-        now = datetime.now(timezone.utc)
-        expired = [job_id for job_id, data in jobs.items()
-                   if (now - data["created"]).total_seconds() > JOB_TTL]
-        for job_id in expired:
-            jobs.pop(job_id, None)
-            print(f"Cleaned up expired job {job_id}")
-        await asyncio.sleep(60)
+        await asyncio.sleep(BAN_WINDOW)
+        now = time.time()
+        for ip in list(ip_hits):
+            hits = ip_hits[ip]
+            while hits and now - hits[0] >= BAN_WINDOW:
+                hits.popleft()
+            if not hits:
+                del ip_hits[ip]
+        while ban_expiry_heap and ban_expiry_heap[0][0] <= now:
+            ban_expires, ip = heapq.heappop(ban_expiry_heap)
+            # Skip entries for bans already lifted by the middleware or since renewed
+            if banned_ips.get(ip) == ban_expires:
+                del banned_ips[ip]
 
 # ---------------- Startup & Shutdown Events ----------------
 @app.on_event("startup")
 async def startup_event():
-    """Start background workers and cleanup task."""
-    global worker_tasks
-    for i in range(WORKER_COUNT):
-        task = asyncio.create_task(worker(i + 1))
-        worker_tasks.append(task)
-    cleanup_task = asyncio.create_task(cleanup_jobs())
-    worker_tasks.append(cleanup_task)
-    print(f"Started {WORKER_COUNT} workers and cleanup task")
+    """Create the Supabase and Redis clients, then start background tasks. Jobs run in worker.py."""
+    global worker_tasks, supabase, http_client, redis_client, claim_job_script
+    # Starlette runs sync endpoints and UploadFile reads on anyio's thread limiter (default 40)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = STARLETTE_THREAD_LIMIT
+    http_client = create_http_client()
+    supabase = await create_supabase_client(http_client)
+    redis_client = create_redis_client()
+    claim_job_script = redis_client.register_script(CLAIM_JOB_LUA)
+    install_signal_handlers()
+    ip_cleanup_task = asyncio.create_task(cleanup_ip_state())
+    worker_tasks.append(ip_cleanup_task)
+    print("Started background tasks")
+
+shutdown_started = False  # shutdown_event may be reached from both uvicorn and our signal handler
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Graceful shutdown: cancel workers and close DB connections."""
+    """Graceful shutdown: cancel background tasks, then close DB connections. Runs at most once."""
+    global shutdown_started
+    if shutdown_started:
+        return
+    shutdown_started = True
     print("Shutting down gracefully...")
     for task in worker_tasks:
         task.cancel()
@@ -204,20 +337,51 @@ async def shutdown_event():
         except asyncio.CancelledError:
             pass
     try:
-        await db_execute(supabase.auth.sign_out)
+        await supabase.auth.sign_out()
     except Exception:
         pass
+    # Close our own pooled client; supabase.postgrest may have been rebuilt by sign_out's auth event
+    for session in (http_client, redis_client):
+        try:
+            await session.aclose()
+        except Exception:
+            pass
+    BLOCKING_EXECUTOR.shutdown(wait=False, cancel_futures=True)
     print("Shutdown complete.")
 
 # Handle signals for graceful shutdown
-def handle_exit(sig, frame):
-    print(f"Received signal {sig}. Exiting...")
-    loop = asyncio.get_event_loop()
-    loop.create_task(shutdown_event())
-    loop.stop()
+def install_signal_handlers():
+    """
+    Register SIGINT/SIGTERM handlers on the running loop so shutdown runs as a coroutine.
+    If the server (e.g. uvicorn) already installed its own handler, defer to it: its
+    graceful exit fires the shutdown event, which runs shutdown_event().
+    Otherwise clean up ourselves, then let the signal's default action end the process;
+    a second signal during cleanup exits immediately.
+    """
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if previous in (signal.SIG_DFL, signal.SIG_IGN, signal.default_int_handler, None):
+            previous = None
+
+        def handle_exit(sig=sig, previous=previous):
+            print(f"Received signal {sig}. Exiting...")
+            if previous:
+                previous(sig, None)
+            else:
+                asyncio.create_task(shutdown_and_exit(sig))
 
-signal.signal(signal.SIGINT, handle_exit)
-signal.signal(signal.SIGTERM, handle_exit)
+        try:
+            loop.add_signal_handler(sig, handle_exit)
+        except NotImplementedError:
+            pass  # Not supported on Windows event loops
+
+async def shutdown_and_exit(sig):
+    """Run shutdown_event(), then re-deliver sig with its default action to terminate."""
+    await shutdown_event()
+    asyncio.get_running_loop().remove_signal_handler(sig)
+    signal.signal(sig, signal.SIG_DFL)
+    signal.raise_signal(sig)
 
 # ---------------- API Endpoints ----------------
 @app.get("/")
@@ -233,47 +397,98 @@ async def fetch(username: str, request: Request):
     Start a scraping job:
         - Returns cached result if fresh
         - Queues new job if stale or not cached
+    Returns Response objects directly, skipping FastAPI's jsonable_encoder pass.
     """
     username = sanitize_username(username)
     if not is_valid_twitter_username(username):
-        return {"error": "Invalid username"}
+        return ORJSONResponse({"error": "Invalid username"})
 
-    # Check cache in Supabase
-    response = await db_execute(
-        supabase.table("tweet_results").select("*").eq("username", username).execute
-    )
-    existing = response.data[0] if response.data else None
+    # Check in-process cache before going to Supabase
+    cached_result = mem_cache_get(username)
+    if cached_result is not None:
+        return ORJSONResponse({"job_id": None, "cached": True, "fresh": True, "result": cached_result})
 
-    if existing:
-        last_updated = datetime.fromisoformat(existing["last_updated"])
-        if last_updated.tzinfo is None:
-            last_updated = last_updated.replace(tzinfo=timezone.utc)
-        age = (datetime.now(timezone.utc) - last_updated).total_seconds()
+    # A job already in flight (queued by any process) is shared without touching Supabase
+    pending_job_id = await get_pending_job(username)
+    if pending_job_id:
+        return ORJSONResponse({"job_id": pending_job_id, "cached": False, "fresh": False})
+
+    # Check freshness first; only pull the (large) result blob from Supabase if it's fresh
+    updated_at_ts = await get_updated_at_ts(username)
+
+    if updated_at_ts is not None:
+        age = time.time() - updated_at_ts
         if age < CACHE_TTL:
-            return {"job_id": None, "cached": True, "fresh": True, "result": existing["result"]}
+            response = await (
+                supabase.table("tweet_results")
+                .select("result")
+                .eq("username", username)
+                .limit(1)
+                .execute()
+            )
+            if response.data:
+                result = response.data[0]["result"]
+                # Warm the in-process cache for the remaining freshness window
+                mem_cache_set(username, result, time.time() + CACHE_TTL - age)
+                return ORJSONResponse({"job_id": None, "cached": True, "fresh": True, "result": result})
+
+    # Claim the username, create the job and queue it atomically; if another request
+    # (from any process) got there first, share its job
+    job_id = secrets.token_urlsafe(9)  # 12 URL-safe chars, 72 random bits
+    claimed_job_id = await claim_job_script(
+        keys=[pending_key(username), job_key(job_id), JOB_QUEUE_KEY],
+        args=[job_id, time.time(), JOB_TTL, QUEUE_MAX, f"{job_id}|{username}"],
+    )
 
-    # Queue new job
-    job_id = str(uuid.uuid4())
-    jobs[job_id] = {"status": "queued", "result": None, "created": datetime.now(timezone.utc)}
-    await job_queue.put((job_id, username))
-    return {"job_id": job_id, "cached": False, "fresh": False}
+    # Backpressure: the queue is over capacity, so nothing was claimed or queued
+    if claimed_job_id is None:
+        return ORJSONResponse(
+            status_code=503,
+            content={"error": "Server busy, try again later."},
+            headers={"Retry-After": "30"}
+        )
+    return ORJSONResponse({"job_id": claimed_job_id, "cached": False, "fresh": False})
 
 @app.get("/status/{job_id}")
 @limiter.limit("30/minute")
 async def status(job_id: str, request: Request):
-    """Get status of a queued/fetching job."""
-    return jobs.get(job_id, {"error": "Invalid job id"})
+    """
+    Get status of a queued/fetching job.
+    Sends a weak ETag of the status so unchanged polls get a bodyless 304.
+    """
+    status = await redis_client.hget(job_key(job_id), "status")
+    if status is None:
+        return ORJSONResponse({"error": "Invalid job id"})
+
+    headers = {"ETag": f'W/"{status}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    if status == "error":
+        result = await redis_client.hget(job_key(job_id), "result")
+        return ORJSONResponse({"status": status, "result": orjson.loads(result) if result else None}, headers=headers)
+    return ORJSONResponse({"status": status}, headers=headers)
 
 @app.get("/result/{job_id}")
 @limiter.limit("30/minute")
 async def result(job_id: str, request: Request):
-    """Get result of a completed job."""
-    job = jobs.get(job_id)
-    if not job:
-        return {"error": "Invalid job id"}
-    if job["status"] != "done":
-        return {"status": job["status"]}
-    return job["result"]
+    """
+    Get result of a completed job.
+    Sends the result's ETag; a matching If-None-Match gets a 304 without loading the result.
+    """
+    status, etag = await redis_client.hmget(job_key(job_id), "status", "etag")
+    if status is None:
+        return ORJSONResponse({"error": "Invalid job id"})
+    if status != "done":
+        return ORJSONResponse({"status": status})
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # The result is stored as JSON already; send it as-is instead of decoding and re-encoding
+    result = await redis_client.hget(job_key(job_id), "result")
+    return Response(content=result, media_type="application/json", headers=headers)
 
 @app.post("/upload/{username}")
 @limiter.limit("3/minute")
@@ -293,72 +508,59 @@ async def upload_heatmap(
         return {"error": "Invalid username"}
 
     try:
-        storage = supabase.storage.from_("heatmaps")
         filename = f"heatmaps/{username}.png"
-        files = await db_execute(storage.list, path="heatmaps")
+        public_url_data = public_heatmap_url(username)
 
-        existing_file = next((f for f in files if f["name"] == f"{username}.png"), None)
-        now_ts = datetime.now(timezone.utc).timestamp()
+        updated_at = _heatmap_updated_cache.get(username)
+        if updated_at is None:
+            # HEAD the single object instead of listing the whole bucket
+            head = await http_client.head(public_url_data)
+            last_modified = head.headers.get("last-modified") if head.status_code == 200 else None
+            if last_modified:
+                updated_at = parsedate_to_datetime(last_modified).timestamp()
+                _heatmap_updated_cache[username] = updated_at
 
-        if existing_file:
-            updated_at = datetime.fromisoformat(existing_file["updated_at"].replace("Z", "+00:00")).timestamp()
-            age = now_ts - updated_at
-            if age < CACHE_TTL:
-                public_url_data = storage.get_public_url(filename)
-                return {"url": public_url_data}
+        if updated_at is not None and time.time() - updated_at < CACHE_TTL:
+            return {"url": public_url_data}
 
-        # Read file bytes
+        # Stream file uploads and data URLs chunk by chunk
         if file:
-            f_bytes = await file.read()
+            content = iter_upload_file(file)
         elif data_url:
             if "," in data_url:
                 _, encoded = data_url.split(",", 1)
             else:
                 encoded = data_url
-            f_bytes = base64.b64decode(encoded)
+            content = iter_base64_decoded(encoded)
         else:
             return {"error": "No file or data_url provided"}
 
-        supabase.storage.from_("heatmaps").upload(
-            file=f_bytes, 
-            path=filename, 
-            file_options={"cache-control": "3600", "upsert": "true", "content-type": "image/png"}
-        )
+        await upload_heatmap_object(filename, content)
+        _heatmap_updated_cache[username] = time.time()
 
-        public_url_data = storage.get_public_url(filename)
         return {"url": public_url_data}
 
     except Exception as e:
         return {"error": str(e)}
 
-@app.get("/share/{username}", response_class=HTMLResponse)
-async def share_heatmap(request: Request, username: str):
-    """Serve a shareable HTML page with the heatmap image."""
-    username = sanitize_username(username)
-    if not is_valid_twitter_username(username):
-        return {"error": "Invalid username"}
-
-    timestamp = int(time.time())
-    image_url = f"{SUPABASE_IMAGE_PUBLIC_BASE}/{username}.png?v={timestamp}"
-    safe_url = html.escape(image_url, quote=True)
-
-    html_content = f"""
+# Share page markup, built once at import; only the escaped username and image URL vary per request
+SHARE_TEMPLATE = string.Template("""
     <!DOCTYPE html>
     <html lang="en">
     <head>
         <meta charset="UTF-8">
-        <title>@{username}'s Heatmap</title>
+        <title>@$safe_username's Heatmap</title>
         <meta name="twitter:card" content="summary_large_image">
-        <meta name="twitter:title" content="@{username}'s Heatmap">
+        <meta name="twitter:title" content="@$safe_username's Heatmap">
         <meta name="twitter:description" content="Generated a heatmap of my tweets!">
-        <meta name="twitter:image" content="{safe_url}">
-        <meta property="og:title" content="@{username}'s Heatmap">
+        <meta name="twitter:image" content="$safe_url">
+        <meta property="og:title" content="@$safe_username's Heatmap">
         <meta property="og:description" content="Generated a heatmap of my tweets!">
-        <meta property="og:image" content="{safe_url}">
+        <meta property="og:image" content="$safe_url">
     </head>
     <body style="display:flex; flex-direction:column; justify-content:center; align-items:center; min-height:100vh; text-align:center; font-family:Arial, sans-serif; background:#f5f7fa; color:#333; padding:20px;">
-        <h1 style="font-size:2.5rem; margin-bottom:20px;">@{username}'s Heatmap</h1>
-        <img src="{safe_url}" alt="Heatmap for {username}" style="max-width:90%; height:auto; border-radius:15px; box-shadow:0 8px 20px rgba(0,0,0,0.2); margin-bottom:30px;">
+        <h1 style="font-size:2.5rem; margin-bottom:20px;">@$safe_username's Heatmap</h1>
+        <img src="$safe_url" alt="Heatmap for $safe_username" style="max-width:90%; height:auto; border-radius:15px; box-shadow:0 8px 20px rgba(0,0,0,0.2); margin-bottom:30px;">
         <a href="https://tweetmap.sakkshm.me" style="text-decoration:none;">
             <button style="padding:15px 30px; font-size:1.2rem; font-weight:bold; color:white; background:#2575fc; border:none; border-radius:50px; cursor:pointer; transition:all 0.3s ease; box-shadow:0 5px 15px rgba(0,0,0,0.2);" 
                 onmouseover="this.style.transform='scale(1.05)'; this.style.boxShadow='0 10px 25px rgba(0,0,0,0.3)';" 
@@ -368,32 +570,92 @@ async def share_heatmap(request: Request, username: str):
         </a>
     </body>
     </html>
+    """)
+
+# Same mapping as html.escape(quote=True), applied in one C-level str.translate pass
+HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+
+def escape_html(text: str) -> str:
+    """Escape text for safe use in HTML content and quoted attributes."""
+    return text.translate(HTML_ESCAPE_TABLE)
+
+SHARE_CACHE_SECONDS = 60  # Share pages (and their image cache-buster) change at most once per bucket
+
+@functools.lru_cache(maxsize=2048)
+def render_share_page(username: str, bucket: int) -> bytes:
+    """
+    Render the share page for username; memoized per SHARE_CACHE_SECONDS time bucket.
+    Returned pre-encoded so cache hits also skip HTMLResponse's str -> UTF-8 encode.
     """
-    return HTMLResponse(content=html_content)
+    image_url = f"{public_heatmap_url(username)}?v={bucket * SHARE_CACHE_SECONDS}"
+    return SHARE_TEMPLATE.substitute(
+        safe_username=escape_html(username),
+        safe_url=escape_html(image_url),
+    ).encode()
+
+@app.get("/share/{username}", response_class=HTMLResponse)
+async def share_heatmap(request: Request, username: str):
+    """Serve a shareable HTML page with the heatmap image."""
+    username = sanitize_username(username)
+    if not is_valid_twitter_username(username):
+        return {"error": "Invalid username"}
+
+    bucket = int(time.time()) // SHARE_CACHE_SECONDS
+    return HTMLResponse(
+        content=render_share_page(username, bucket),
+        headers={"Cache-Control": f"public, max-age={SHARE_CACHE_SECONDS}"}
+    )
 
 # ---------------- Health Check Endpoints ----------------
 @app.get("/health", tags=["Health"])
 async def health():
     """
     Health check endpoint.
-    Returns status of app, DB, queue size, and active jobs.
+    Returns status of app, DB, Redis, and queue size.
     """
     try:
-        response = await db_execute(supabase.table("tweet_results").select("username").limit(1).execute)
+        response = await supabase.table("tweet_results").select("username").limit(1).execute()
         db_status = "ok" if response.data is not None else "fail"
     except Exception:
         db_status = "fail"
 
+    try:
+        jobs_in_queue = await redis_client.llen(JOB_QUEUE_KEY)
+        redis_status = "ok"
+    except Exception:
+        jobs_in_queue = None
+        redis_status = "fail"
+
     status = {
         "app": "ok",
         "db": db_status,
-        "jobs_in_queue": job_queue.qsize(),
-        "active_jobs": len([j for j in jobs.values() if j["status"] == "fetching"])
+        "redis": redis_status,
+        "jobs_in_queue": jobs_in_queue
     }
 
-    return JSONResponse(status_code=200 if db_status == "ok" else 503, content=status)
+    healthy = db_status == "ok" and redis_status == "ok"
+    return ORJSONResponse(status_code=200 if healthy else 503, content=status)
 
 @app.get("/ready", tags=["Health"])
 async def readiness():
     """Readiness probe endpoint. Returns 200 if server is ready to accept requests."""
-    return JSONResponse(status_code=200, content={"ready": True})
+    return ORJSONResponse(status_code=200, content={"ready": True})
+
+# ---------------- Entrypoint ----------------
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop/httptools (from uvicorn[standard]) replace the pure-Python event loop and HTTP parser
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", 8000)),
+        loop="uvloop",
+        http="httptools",
+    )
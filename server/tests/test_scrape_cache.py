@@ -0,0 +1,63 @@
+"""Tests for the on-disk scrape cache used by scrape_tweets()."""
+import asyncio
+import importlib
+
+import pytest
+
+import utils.scrape_tweets
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    """scrape_tweets reloaded against a temporary TWEETMAP_CACHE_DIR, with the live scrape faked."""
+    monkeypatch.setenv("TWEETMAP_CACHE_DIR", str(tmp_path))
+    module = importlib.reload(utils.scrape_tweets)
+    module.scrape_calls = []
+
+    async def fake_scrape(target_username):
+        module.scrape_calls.append(target_username)
+        return {"total_tweets_fetched": len(module.scrape_calls)}
+
+    monkeypatch.setattr(module, "_scrape_tweets", fake_scrape)
+    yield module
+    if module._cache_conn is not None:
+        module._cache_conn.close()
+
+
+def test_cache_dir_comes_from_env(scraper, tmp_path):
+    assert scraper.CACHE_DIR == str(tmp_path)
+    asyncio.run(scraper.scrape_tweets("someone", cache_ttl=60))
+    assert (tmp_path / "scrape_cache.sqlite").exists()
+
+
+def test_miss_then_hit(scraper):
+    first = asyncio.run(scraper.scrape_tweets("someone", cache_ttl=60))
+    second = asyncio.run(scraper.scrape_tweets("SomeOne", cache_ttl=60))
+    assert first == second == {"total_tweets_fetched": 1}
+    assert scraper.scrape_calls == ["someone"]
+
+
+def test_expired_entry_is_scraped_again(scraper, monkeypatch):
+    asyncio.run(scraper.scrape_tweets("someone", cache_ttl=60))
+    now = scraper.time.time()
+    monkeypatch.setattr(scraper.time, "time", lambda: now + 60)
+    result = asyncio.run(scraper.scrape_tweets("someone", cache_ttl=60))
+    assert result == {"total_tweets_fetched": 2}
+    assert len(scraper.scrape_calls) == 2
+
+
+def test_zero_ttl_bypasses_cache(scraper):
+    asyncio.run(scraper.scrape_tweets("someone", cache_ttl=60))
+    result = asyncio.run(scraper.scrape_tweets("someone", cache_ttl=0))
+    assert result == {"total_tweets_fetched": 2}
+
+
+def test_errors_are_not_cached(scraper, monkeypatch):
+    async def failing_scrape(target_username):
+        scraper.scrape_calls.append(target_username)
+        return {"error": "User not found."}
+
+    monkeypatch.setattr(scraper, "_scrape_tweets", failing_scrape)
+    asyncio.run(scraper.scrape_tweets("someone", cache_ttl=60))
+    asyncio.run(scraper.scrape_tweets("someone", cache_ttl=60))
+    assert len(scraper.scrape_calls) == 2
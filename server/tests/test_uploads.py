@@ -0,0 +1,31 @@
+"""Tests for decoding data-URL uploads in chunks (main.iter_base64_decoded)."""
+import asyncio
+import base64
+import os
+
+import main
+
+
+def decode_all(encoded: str) -> bytes:
+    """Collect every chunk yielded by iter_base64_decoded."""
+    async def collect():
+        return b"".join([chunk async for chunk in main.iter_base64_decoded(encoded)])
+    return asyncio.run(collect())
+
+
+def test_decodes_payload_not_a_multiple_of_chunk_size():
+    data = os.urandom(3 * main.DATA_URL_CHUNK_SIZE // 4 * 2 + 1234)
+    encoded = base64.b64encode(data).decode()
+    assert len(encoded) % main.DATA_URL_CHUNK_SIZE != 0
+    assert decode_all(encoded) == data
+
+
+def test_decodes_mime_wrapped_payload():
+    data = os.urandom(3 * 1024 * 1024)
+    encoded = base64.encodebytes(data).decode()  # Wrapped every 76 chars
+    assert decode_all(encoded) == data
+
+
+def test_ignores_surrounding_whitespace():
+    data = os.urandom(1000)
+    assert decode_all(f"  {base64.b64encode(data).decode()}\r\n") == data
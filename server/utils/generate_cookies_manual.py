@@ -1,17 +1,18 @@
-import json
 import os
 
+import orjson
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ACCOUNTS_FILE = os.path.join(BASE_DIR, "../account-configs/accounts.json")
-COOKIES_DIR = os.path.join(BASE_DIR, "../account-cookies")
+ACCOUNTS_FILE = os.getenv("TWEETMAP_ACCOUNTS_FILE", os.path.join(BASE_DIR, "../account-configs/accounts.json"))
+COOKIES_DIR = os.getenv("TWEETMAP_COOKIES_DIR", os.path.join(BASE_DIR, "../account-cookies"))
 os.makedirs(COOKIES_DIR, exist_ok=True)
 
 # Keys to prioritize in final cookie
-DESIRED_KEYS = [
+DESIRED_KEYS = (
     "guest_id_marketing","guest_id_ads","personalization_id","guest_id","__cf_bm",
     "att","_twitter_sess","kdt","twid","ct0","auth_token"
-]
+)
 
 def input_cookie_and_save(account):
     username = account.get("username", "unknown")
@@ -33,8 +34,8 @@ def input_cookie_and_save(account):
     raw = "\n".join(lines)
 
     try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as e:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError as e:
         print("Invalid JSON! Skipping this account.", e)
         return
 
@@ -47,19 +48,14 @@ def input_cookie_and_save(account):
         print("Unexpected format! Must be a list or dict. Skipping.")
         return
 
-    # Build final dict with desired key order
-    final_cookies = {}
-    for key in DESIRED_KEYS:
-        if key in cookie_map:
-            final_cookies[key] = cookie_map[key]
-    for k, v in cookie_map.items():
-        if k not in final_cookies:
-            final_cookies[k] = v
+    # Build final dict with desired key order (desired keys first, then the rest;
+    # merging keeps the first-inserted position of each key)
+    final_cookies = {**{k: cookie_map[k] for k in DESIRED_KEYS if k in cookie_map}, **cookie_map}
 
     # Save to file
     cookie_path = os.path.join(COOKIES_DIR, f"cookie_{username}.json")
-    with open(cookie_path, "w", encoding="utf-8") as f:
-        json.dump(final_cookies, f, indent=2)
+    with open(cookie_path, "wb") as f:
+        f.write(orjson.dumps(final_cookies, option=orjson.OPT_INDENT_2))
 
     print(f"Saved cookies for {username} -> {cookie_path}")
     print("Keys saved (in order):", list(final_cookies.keys()))
@@ -67,12 +63,12 @@ def input_cookie_and_save(account):
 def main():
     # Load accounts
     try:
-        with open(ACCOUNTS_FILE, 'r', encoding='utf-8') as f:
-            accounts = json.load(f)
+        with open(ACCOUNTS_FILE, 'rb') as f:
+            accounts = orjson.loads(f.read())
     except FileNotFoundError:
         print(f"Accounts file not found: {ACCOUNTS_FILE}")
         return
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"Invalid JSON in accounts file: {e}")
         return
 
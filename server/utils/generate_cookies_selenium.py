@@ -1,12 +1,14 @@
-import json, time, os
+import time, os, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ACCOUNTS_FILE = os.path.join(BASE_DIR, "../account-configs/accounts.json")
-COOKIES_DIR = os.path.join(BASE_DIR, "../account-cookies")
+ACCOUNTS_FILE = os.getenv("TWEETMAP_ACCOUNTS_FILE", os.path.join(BASE_DIR, "../account-configs/accounts.json"))
+COOKIES_DIR = os.getenv("TWEETMAP_COOKIES_DIR", os.path.join(BASE_DIR, "../account-cookies"))
 os.makedirs(COOKIES_DIR, exist_ok=True)
 
 # Keys we want to prioritize in the final cookie.json
@@ -14,25 +16,51 @@ DESIRED_KEYS = [
     "guest_id_marketing","guest_id_ads","personalization_id","guest_id","__cf_bm",
     "att","_twitter_sess","kdt","twid","ct0","auth_token"
 ]
+DESIRED_SET = frozenset(DESIRED_KEYS)
 
-# Delay between accounts to reduce rate-limits
+# Delay between account logins to reduce rate-limits, shared by all browser sessions
 TIMEOUT_DELAY = 30  # seconds
 
+# Number of Chrome sessions run in parallel, each reused across accounts
+POOL_SIZE = int(os.getenv("SELENIUM_POOL_SIZE", 4))
+
+# Resolve (and download if needed) the chromedriver binary once, not per browser session.
+# Left as None if that fails (e.g. offline) so the import still works; create_driver retries.
+try:
+    _CHROMEDRIVER_PATH = ChromeDriverManager().install()
+except Exception as e:
+    print(f"Could not resolve chromedriver at startup: {e}")
+    _CHROMEDRIVER_PATH = None
+
+# Only one login prompt reads from the terminal at a time
+_prompt_lock = threading.Lock()
+
+class LoginPacer:
+    """Hands out login start times at least `interval` seconds apart across all worker threads."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        time.sleep(slot - now)
+
 def save_cookies(driver, username):
     cookies = driver.get_cookies()
     cookie_obj = {c['name']: c['value'] for c in cookies}
 
-    final = {}
-    for k in DESIRED_KEYS:
-        if k in cookie_obj:
-            final[k] = cookie_obj[k]
-    for k, v in cookie_obj.items():
-        if k not in final:
-            final[k] = v
+    # Desired keys first (in DESIRED_KEYS order), then the rest as received
+    final = {k: cookie_obj[k] for k in DESIRED_KEYS if k in cookie_obj}
+    final.update((k, v) for k, v in cookie_obj.items() if k not in DESIRED_SET)
 
     cookie_path = os.path.join(COOKIES_DIR, f"cookie_{username}.json")
-    with open(cookie_path, 'w', encoding='utf-8') as f:
-        json.dump(final, f, indent=2)
+    with open(cookie_path, 'wb') as f:
+        f.write(orjson.dumps(final, option=orjson.OPT_INDENT_2))
 
     print(f"Saved {len(final)} cookies for {username} -> {cookie_path}")
     print("Preview keys:", list(final.keys()))
@@ -52,43 +80,75 @@ def format_account_block(account):
     )
     return block
 
-def login_and_save(account):
-    print(f"\nProcessing account: {account['username']}")
-
+def create_driver():
+    """Start a Chrome session for the pool."""
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")
-    # Set account-specific user-agent
-    if account.get("user_agent"):
-        options.add_argument(f"user-agent={account['user_agent']}")
     # You can add proxy/captcha settings here if needed
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=options)
+    service = Service(_CHROMEDRIVER_PATH or ChromeDriverManager().install())
+    return webdriver.Chrome(service=service, options=options)
 
+def quit_driver(driver):
+    """Close a pooled Chrome session, ignoring empty slots and sessions that already died."""
+    if driver is None:
+        return
     try:
-        # Open login page first so you can paste credentials
-        driver.get("https://x.com/login")
+        driver.quit()
+    except Exception as e:
+        print(f"Failed to close browser session: {e}")
 
+def login_and_save(account, driver):
+    print(f"\nProcessing account: {account['username']}")
+
+    # Set account-specific user-agent on the reused session
+    if account.get("user_agent"):
+        driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": account["user_agent"]})
+
+    # Open login page first so you can paste credentials
+    driver.get("https://x.com/login")
+
+    with _prompt_lock:
         # Print account info block for easy copy
         acct_block = format_account_block(account)
         print("\n" + acct_block)
 
-        input("After you've submitted the credentials in the browser, press ENTER here to continue and save cookies...")
+        input(f"After you've submitted the credentials for {account['username']} in the browser, press ENTER here to continue and save cookies...")
+
+    # navigate to main domain to collect cookies
+    driver.get("https://x.com")
+    time.sleep(2)
 
-        # navigate to main domain to collect cookies
-        driver.get("https://x.com")
-        time.sleep(2)
+    save_cookies(driver, account['username'])
 
-        save_cookies(driver, account['username'])
+def run_pooled(account, pool, pacer):
+    """
+    Log into one account on a driver borrowed from the pool, then hand the driver back clean.
+    Only live drivers go back; a broken one is closed and its slot returned empty (None),
+    to be replaced by a fresh session when it is next borrowed.
+    """
+    pacer.wait()
+    driver = pool.get()
+    try:
+        if driver is None:
+            driver = create_driver()
+        login_and_save(account, driver)
+        # Log out of this account before the next one reuses the session
+        driver.delete_all_cookies()
+    except Exception as e:
+        print(f"Error handling account {account['username']}: {e}")
+        # The session may be broken (e.g. window closed); drop it
+        quit_driver(driver)
+        driver = None
     finally:
-        time.sleep(1)
-        driver.quit()
+        pool.put(driver)
 
 def main():
     try:
-        with open(ACCOUNTS_FILE, 'r', encoding='utf-8') as f:
-            accounts = json.load(f)
+        with open(ACCOUNTS_FILE, 'rb') as f:
+            accounts = orjson.loads(f.read())
 
+        pending = []
         for acc in accounts:
             if acc.get("status") != "active":
                 print(f"Skipping inactive account: {acc.get('username')}")
@@ -99,13 +159,28 @@ def main():
                 print(f"Cookie already exists for {acc['username']}, skipping...")
                 continue
 
-            login_and_save(acc)
-            print(f"Waiting {TIMEOUT_DELAY} seconds before next account...")
-            time.sleep(TIMEOUT_DELAY)
+            pending.append(acc)
+
+        if not pending:
+            return
+
+        # Pre-warm the browser sessions, then log in up to POOL_SIZE accounts at once
+        pool_size = min(POOL_SIZE, len(pending))
+        pool = queue.Queue()
+        pacer = LoginPacer(TIMEOUT_DELAY)
+        try:
+            for _ in range(pool_size):
+                pool.put(create_driver())
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                list(executor.map(lambda acc: run_pooled(acc, pool, pacer), pending))
+        finally:
+            # Close every session, even if one fails to quit or pre-warming stopped partway
+            while not pool.empty():
+                quit_driver(pool.get())
 
     except FileNotFoundError:
         print(f"Accounts file not found: {ACCOUNTS_FILE}")
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print(f"Invalid JSON in accounts file: {e}")
     except Exception as e:
         print("Unexpected error:", e)
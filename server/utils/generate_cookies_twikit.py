@@ -6,82 +6,92 @@ TODO: Look into Client setting/params to prevent blocking
 """
 
 import asyncio
-import json
 import os
+import random
+
+import orjson
 from twikit import Client
 
 # Base directory of this script
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # File path where Twitter account credentials are stored
-ACCOUNTS_FILE = os.path.join(BASE_DIR, "../account-configs/accounts.json")
+ACCOUNTS_FILE = os.getenv("TWEETMAP_ACCOUNTS_FILE", os.path.join(BASE_DIR, "../account-configs/accounts.json"))
 
 # Directory where cookie files will be saved
-COOKIES_DIR = os.path.join(BASE_DIR, "../account-cookies")
+COOKIES_DIR = os.getenv("TWEETMAP_COOKIES_DIR", os.path.join(BASE_DIR, "../account-cookies"))
+
+# Waiting time after each login to avoid being rate-limited (sec), jittered per account
+TIMEOUT_DELAY_RANGE = (40, 80)
 
-# Waiting time to avoid being rate-limited (sec)
-TIMEOUT_DELAY = 60  # 1 minute
+# Max number of accounts logging in at the same time
+CONCURRENCY = int(os.getenv("TWIKIT_CONCURRENCY", 3))
+
+async def process_account(person, sem):
+    """
+    Log into a single account and save its cookies.
+    Holds a slot of `sem` for the login and the cool-down delay that follows.
+    """
+    async with sem:
+        try:
+            if person['status'] != 'active':
+                raise Exception("Account either banned or not implemented")
+
+            # Each account gets its own client so concurrent logins don't share session state
+            client = Client('en-US')
+
+            # Path for saving the cookie file for this account
+            cookies_path = os.path.join(COOKIES_DIR, f"cookie_{person['username']}.json")
+
+            # Mask password before printing for safety
+            safe_person = {**person, "password": "***"}
+            print(f"\nTrying to get cookies for: \n{orjson.dumps(safe_person, option=orjson.OPT_INDENT_2).decode()}")
+
+            # Skip login if cookie file already exists
+            if os.path.exists(cookies_path):
+                print(f"Cookie file already exists for {person['username']}, skipping...")
+                return
+
+            # twikit writes the cookies to cookies_file after a successful login
+            await client.login(
+                auth_info_1=person['username'],
+                auth_info_2=person['email'],
+                password=person['password'],
+                cookies_file=cookies_path
+            )
+
+            print(f"Cookie generated and saved for {person['username']}")
+            # Wait some time to avoid being rate-limited; jitter keeps parallel slots from syncing up
+            delay = random.uniform(*TIMEOUT_DELAY_RANGE)
+            print(f"Waiting {delay:.0f} sec.")
+            await asyncio.sleep(delay)
+
+        except Exception as e:
+            # Catch and print errors specific to this account
+            print(f"Error handling account {person['username']}: {e}\n")
 
 async def main():
     """
     Main coroutine:
     - Reads account credentials from JSON
-    - Logs into each account
+    - Logs into up to CONCURRENCY accounts at a time
     - Saves cookies for session persistence
-    - Logs out safely
     """
 
     try:
-        with open(ACCOUNTS_FILE, "r") as file:
-            data = json.load(file)
-
-            # Ensure cookies directory exists
-            os.makedirs(COOKIES_DIR, exist_ok=True)
-
-            for person in data:
-                try:
-                    if person['status'] != 'active':
-                        raise Exception("Account either banned or not implemented")
-
-                    client = Client('en-US')
-
-                    # Path for saving the cookie file for this account
-                    cookies_path = os.path.join(COOKIES_DIR, f"cookie_{person['username']}.json")
-
-                    # Mask password before printing for safety
-                    safe_person = {**person, "password": "***"}
-                    print(f"\nTrying to get cookies for: \n{json.dumps(safe_person, indent=2)}")
-
-                    # Skip login if cookie file already exists
-                    if os.path.exists(cookies_path):
-                        print(f"Cookie file already exists for {person['username']}, skipping...")
-                        continue
-
-                    await client.login(
-                        auth_info_1=person['username'],
-                        auth_info_2=person['email'],
-                        password=person['password'],
-                        cookies_file=cookies_path
-                    )
-
-                    print(f"Cookie generated for {person['username']}")
-
-                    # Save cookies to file
-                    client.save_cookies(cookies_path)
-                    print(f"Cookie saved for {person['username']}")
-                    print(f"Waiting {TIMEOUT_DELAY} sec.")
+        with open(ACCOUNTS_FILE, "rb") as file:
+            data = orjson.loads(file.read())
 
-                    # Wait some time to avoid being rate-limited
-                    await asyncio.sleep(TIMEOUT_DELAY)
+        # Ensure cookies directory exists
+        os.makedirs(COOKIES_DIR, exist_ok=True)
 
-                except Exception as e:
-                    # Catch and print errors specific to this account
-                    print(f"Error handling account {person['username']}: {e}\n")
+        sem = asyncio.Semaphore(CONCURRENCY)
+        await asyncio.gather(*(process_account(person, sem) for person in data), return_exceptions=True)
 
     except FileNotFoundError:
         print("Error: 'accounts.json' not found.")
 
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         print("Error: Invalid JSON format in 'accounts.json'.")
         print(e)
 
@@ -11,10 +11,10 @@ import os
 from twikit import Client
 
 # File path where Twitter account credentials are stored
-ACCOUNTS_FILE = "../account-configs/accounts.json"
+ACCOUNTS_FILE = os.getenv("TWEETMAP_ACCOUNTS_FILE", "../account-configs/accounts.json")
 
 # Directory where cookie files will be saved
-COOKIES_DIR = "../account-cookies"
+COOKIES_DIR = os.getenv("TWEETMAP_COOKIES_DIR", "../account-cookies")
 
 # Waiting time to avoid being rate-limited (sec)
 TIMEOUT_DELAY = 60
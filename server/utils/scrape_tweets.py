@@ -1,78 +1,334 @@
 import asyncio
 import datetime
-import json
+import mmap
+import operator
 import os
 import random
-from collections import Counter
-from itertools import cycle
+import sqlite3
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+import orjson
 from twikit import Client
+from twikit.errors import TooManyRequests, Unauthorized
 
 # ---------------- Paths ----------------
 # Base paths for configs and cookies
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-ACCOUNTS_FILE = os.path.join(BASE_DIR, "../account-configs", "accounts.json")  # Account config JSON
-COOKIES_DIR = os.path.join(BASE_DIR, "../account-cookies")  # Directory to save cookies
+# Both overridable via env so every script and deployment points at the same files
+ACCOUNTS_FILE = os.getenv("TWEETMAP_ACCOUNTS_FILE", os.path.join(BASE_DIR, "../account-configs", "accounts.json"))  # Account config JSON
+COOKIES_DIR = os.getenv("TWEETMAP_COOKIES_DIR", os.path.join(BASE_DIR, "../account-cookies"))  # Directory to save cookies
+CACHE_DIR = os.getenv("TWEETMAP_CACHE_DIR", os.path.join(BASE_DIR, "../scrape-cache"))  # Directory for the on-disk scrape cache
+SCRAPE_CACHE_FILE = os.path.join(CACHE_DIR, "scrape_cache.sqlite")
+os.makedirs(COOKIES_DIR, exist_ok=True)  # Once at import rather than per login
 
 # ---------------- Scraper Settings ----------------
 MAX_TWEETS = 500  # Max tweets to fetch for a given target
-PAGE_DELAY_RANGE = (2, 5)  # Random delay (seconds) between pagination requests
+PAGE_RATE_PER_SECOND = 0.3  # Max pagination requests per second for each account
+RETRY_ATTEMPTS = 3  # Tries per page request when rate-limited
+RETRY_BASE_DELAY = 1.0  # Seconds before the first retry, doubled on each further attempt
+RETRY_MAX_DELAY = 30.0  # Cap on a single backoff delay
+SCRAPE_CACHE_TTL = int(os.getenv("SCRAPE_CACHE_TTL", 3600))  # Seconds a cached same-day result is reused (0 disables)
+# Profile attributes read off the twikit User for user_info, fetched in one C-level call
+_user_fields = operator.attrgetter(
+    "screen_name", "name", "profile_image_url", "is_blue_verified",
+    "created_at_datetime", "default_profile_image",
+)
 
 # ---------------- Account Cycling ----------------
-_account_cycle = None  # Round-robin cycle iterator for accounts
-_failed_accounts = set()  # Track accounts that failed in current cycle
+MMAP_THRESHOLD = 1 << 20  # accounts.json files larger than this (bytes) are parsed from an mmap
+_healthy = deque()  # Round-robin queue of active accounts not marked failed; refilled once empty
+_accounts_cache = None  # Parsed accounts.json, reused until the file's mtime changes
+_accounts_mtime = 0.0
+_active_accounts = []  # Accounts with status "active", derived alongside _accounts_cache
+
+
+def _parse_accounts_file(file):
+    """
+    Parse an open accounts.json. Large files are handed to orjson straight from an mmap,
+    skipping the copy into a bytes object; falls back to a plain read where mmap fails.
+    """
+    if os.fstat(file.fileno()).st_size > MMAP_THRESHOLD:
+        try:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    return orjson.loads(view)
+                finally:
+                    view.release()  # mmap can't close while a view is exported
+        except OSError:
+            pass
+    return orjson.loads(file.read())
 
 
 def load_accounts():
-    """Load accounts from the account-configs/accounts.json file."""
+    """
+    Load accounts from the account-configs/accounts.json file.
+    The parsed list is cached and only re-read when the file's mtime changes.
+    """
+    global _accounts_cache, _accounts_mtime, _active_accounts
     try:
-        with open(ACCOUNTS_FILE, "r") as file:
-            accounts = json.load(file)
+        mtime = os.stat(ACCOUNTS_FILE).st_mtime
+        if _accounts_cache is not None and mtime == _accounts_mtime:
+            return _accounts_cache
+
+        with open(ACCOUNTS_FILE, "rb") as file:
+            accounts = _parse_accounts_file(file)
+        _accounts_cache, _accounts_mtime = accounts, mtime
+        _active_accounts = [acct for acct in accounts if acct.get("status") == "active"]
+        _healthy.clear()  # Restart the rotation over the updated accounts
         return accounts
     except Exception as e:
         print(f"[ERROR] Failed to load accounts: {e}")
+        _accounts_cache, _active_accounts = None, []
         return []
 
 
+def get_active_accounts():
+    """Return the accounts with status "active", recomputed only when accounts.json changes."""
+    load_accounts()
+    return _active_accounts
+
+
 def get_next_account():
     """
-    Select the next active account using round-robin cycling.
-    If all accounts have failed, reset the cycle.
+    Select the next healthy account in round-robin order.
+    If all accounts have failed, start over with every active account.
+    Contains no awaits, so concurrent scrape tasks on one event loop always get distinct picks.
     """
-    global _account_cycle, _failed_accounts
-
-    # Load accounts from config
-    accounts = load_accounts()
-    # Filter only active accounts
-    active_accounts = [acct for acct in accounts if acct.get("status") == "active"]
+    # Load active accounts from config
+    active_accounts = get_active_accounts()
 
     if not active_accounts:
         print("[ERROR] No active accounts available!")
         return None
 
-    # Reset the cycle if it's not initialized OR all active accounts failed
-    if _account_cycle is None or len(_failed_accounts) >= len(active_accounts):
-        _account_cycle = cycle(active_accounts)
-        _failed_accounts.clear()
-        print(f"[INFO] Reset account cycle with {len(active_accounts)} active accounts.")
+    # Refill the rotation if it's not initialized OR all active accounts failed
+    if not _healthy:
+        _healthy.extend(active_accounts)
+        print(f"[INFO] Reset account rotation with {len(active_accounts)} active accounts.")
 
-    # Pick the next account in round-robin fashion
-    account = next(_account_cycle)
+    # Take the front account and move it to the back
+    account = _healthy.popleft()
+    _healthy.append(account)
     print(f"[INFO] Selected account: {account['username']}")
     return account
 
 
 def mark_account_failed(username: str):
-    """Mark a given account as failed so it’s skipped until cycle resets."""
-    global _failed_accounts
-    _failed_accounts.add(username)
+    """Drop a failed account from the rotation so it’s skipped until the rotation resets."""
+    for account in [acct for acct in _healthy if acct["username"] == username]:
+        _healthy.remove(account)
     print(f"[WARN] Account {username} marked as failed.")
 
 
+# ---------------- Client Pool ----------------
+_client_pool = {}  # Logged-in twikit clients keyed by account username, reused across scrapes
+_login_locks = defaultdict(asyncio.Lock)  # Per-account locks so concurrent scrapes don't log in twice
+_session_generation = defaultdict(int)  # Bumped per account whenever its client gets a new session
+
+
+def _cookies_path(username: str) -> str:
+    """Path of an account's saved session cookies."""
+    return os.path.join(COOKIES_DIR, f"cookie_{username}.json")
+
+
+async def _login(client: Client, account: dict):
+    """Log client in with the account's credentials and save the session cookies for reuse."""
+    username = account["username"]
+    print(f"[INFO] Logging in with account: {username}")
+    await client.login(
+        auth_info_1=username,
+        auth_info_2=account["email"],
+        password=account["password"]
+    )
+    client.save_cookies(_cookies_path(username))
+    _session_generation[username] += 1
+    print("[INFO] Login successful!")
+
+
+async def _get_or_login(account: dict) -> Client:
+    """
+    Return the pooled client for an account, creating it on first use.
+    Saved cookies are loaded as-is (no login round trip); credentials are only used
+    when no cookie file exists yet, or via _relogin() once Twitter rejects the cookies.
+    """
+    username = account["username"]
+    client = _client_pool.get(username)
+    if client is not None:
+        return client
+
+    async with _login_locks[username]:
+        client = _client_pool.get(username)
+        if client is None:
+            client = Client("en-US", user_agent=account.get("user_agent"))
+            cookies_path = _cookies_path(username)
+            if os.path.exists(cookies_path):
+                client.load_cookies(cookies_path)
+            else:
+                await _login(client, account)
+            _client_pool[username] = client
+    return client
+
+
+async def _relogin(client: Client, account: dict, seen_generation: int):
+    """
+    Replace a rejected cookie session with a fresh credential login.
+    seen_generation is the session the caller saw rejected; if another scrape has already
+    logged in again since then, its session is reused instead of logging in a second time.
+    """
+    username = account["username"]
+    async with _login_locks[username]:
+        if _session_generation[username] != seen_generation:
+            return
+        client.http.cookies.clear()  # Don't send the rejected session's cookies with the login flow
+        await _login(client, account)
+
+
+# ---------------- Rate Limiting ----------------
+class RateLimiter:
+    """
+    Spaces calls at least 1/rate_per_sec apart. Each acquire() reserves the next free
+    slot before sleeping, so concurrent callers queue up instead of firing together.
+    """
+
+    def __init__(self, rate_per_sec: float):
+        self.interval = 1 / rate_per_sec
+        self.last_call = float("-inf")
+
+    async def acquire(self):
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self.last_call + self.interval)
+        self.last_call = slot
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+_page_limiters = defaultdict(lambda: RateLimiter(PAGE_RATE_PER_SECOND))  # Per-account pagination pacing
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    """Whether an error from twikit looks like a (transient) rate limit."""
+    if isinstance(error, TooManyRequests):
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "429" in message
+
+
+async def _with_retry(coro_factory, max_attempts=RETRY_ATTEMPTS, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """
+    Await coro_factory(), retrying rate-limit errors with jittered exponential backoff.
+    Other errors, and the last failed attempt, are raised to the caller.
+    """
+    for attempt in range(max_attempts):
+        try:
+            return await coro_factory()
+        except Exception as e:
+            if attempt == max_attempts - 1 or not _is_rate_limited(e):
+                raise
+            delay = min(cap, base * 2 ** attempt) + random.uniform(0, 0.3)
+            print(f"[WARN] Rate limited ({e}), retrying in {delay:.2f}s...")
+            await asyncio.sleep(delay)
+
+
+# ---------------- Scrape Cache ----------------
+# Results keyed by (target, UTC day) in SQLite (WAL, so readers don't block the writer);
+# blocking sqlite calls run via asyncio.to_thread on one shared connection, serialized by a lock
+_cache_conn = None
+_cache_lock = threading.Lock()
+
+
+def _cache_connection():
+    """Return the cache database connection, opening it and creating the schema on first use."""
+    global _cache_conn
+    if _cache_conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(SCRAPE_CACHE_FILE, timeout=5, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "user TEXT NOT NULL, day TEXT NOT NULL, saved_at REAL NOT NULL, payload BLOB NOT NULL, "
+            "PRIMARY KEY (user, day))"
+        )
+        _cache_conn = conn
+    return _cache_conn
+
+
+def _cache_get(user: str, day: str, ttl: float):
+    """Return the cached result for (user, day) if saved within ttl seconds, else None."""
+    with _cache_lock:
+        conn = _cache_connection()
+        row = conn.execute("SELECT payload, saved_at FROM cache WHERE user = ? AND day = ?", (user, day)).fetchone()
+    if row is None or time.time() - row[1] >= ttl:
+        return None
+    return orjson.loads(row[0])
+
+
+def _cache_put(user: str, day: str, result: dict):
+    """Store (or replace) the result for (user, day)."""
+    payload = orjson.dumps(result)
+    with _cache_lock:
+        conn = _cache_connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (user, day, saved_at, payload) VALUES (?, ?, ?, ?)",
+                (user, day, time.time(), payload),
+            )
+
+
 # ---------------- Scraper ----------------
-async def scrape_tweets(target_username: str):
+async def fetch_next_page(tweets_page, limiter: RateLimiter):
+    """Fetch the next page of tweets in the account's next pagination slot, retrying rate limits."""
+    async def attempt():
+        await limiter.acquire()
+        return await tweets_page.next()
+
+    return await _with_retry(attempt)
+
+
+def page_ends_scrape(tweets_page, count: int, cutoff_date) -> bool:
+    """
+    Whether processing this page will stop the scrape (MAX_TWEETS or the cutoff reached).
+    The next-page request is sent before the page is processed, so this is checked up front
+    to avoid spending a request and a rate-limit slot on a page that would be discarded.
+    """
+    if count + len(tweets_page) >= MAX_TWEETS:
+        return True
+    # Pages are newest first, so the last tweet tells whether the cutoff falls on this page
+    return len(tweets_page) > 0 and tweets_page[-1].created_at_datetime < cutoff_date
+
+
+async def scrape_tweets(target_username: str, cache_ttl: float = SCRAPE_CACHE_TTL):
+    """
+    Scrape tweets for a given target username, reusing a result cached on disk
+    earlier the same UTC day if it is younger than cache_ttl seconds.
+    """
+    if cache_ttl <= 0:
+        return await _scrape_tweets(target_username)
+
+    key = (target_username.lower(), datetime.datetime.now(datetime.timezone.utc).date().isoformat())
+    try:
+        cached = await asyncio.to_thread(_cache_get, *key, cache_ttl)
+        if cached is not None:
+            print(f"[INFO] Using cached scrape for target: {target_username}")
+            return cached
+    except Exception as e:
+        print(f"[WARN] Scrape cache read failed: {e}")
+
+    result = await _scrape_tweets(target_username)
+    if not result.get("error"):
+        try:
+            await asyncio.to_thread(_cache_put, *key, result)
+        except Exception as e:
+            print(f"[WARN] Scrape cache write failed: {e}")
+    return result
+
+
+async def _scrape_tweets(target_username: str):
     """
     Scrape tweets for a given target username.
-    Uses twikit client with account cycling and cookie persistence.
+    Uses pooled twikit clients with account cycling and cookie persistence.
     """
     print(f"[INFO] Starting scrape for target: {target_username}")
 
@@ -81,110 +337,136 @@ async def scrape_tweets(target_username: str):
     if not account:
         return {"error": "No active accounts available for scraping."}
 
-    # Extract account credentials
     username = account["username"]
-    email = account["email"]
-    password = account["password"]
-    user_agent = account.get("user_agent")
-
-    # Ensure cookies directory exists
-    os.makedirs(COOKIES_DIR, exist_ok=True)
-    cookies_path = os.path.join(COOKIES_DIR, f"cookie_{username}.json")
-
-    # Create twikit client
-    client = Client("en-US", user_agent=user_agent)
 
     try:
-        # Login using account (with cookie persistence)
-        print(f"[INFO] Logging in with account: {username}")
-        await client.login(
-            auth_info_1=username,
-            auth_info_2=email,
-            password=password,
-            cookies_file=cookies_path
-        )
-        print("[INFO] Login successful!")
-
-        # Fetch target user object
-        user = await client.get_user_by_screen_name(target_username)
+        # Reuse this account's logged-in client, logging in only on first use
+        client = await _get_or_login(account)
+
+        # Fetch target user object (the first authenticated call, so it also validates the session)
+        generation = _session_generation[username]
+        try:
+            user = await client.get_user_by_screen_name(target_username)
+        except Unauthorized:
+            print(f"[WARN] Saved session for {username} was rejected, logging in again...")
+            await _relogin(client, account, generation)
+            user = await client.get_user_by_screen_name(target_username)
         if not user:
             print("[ERROR] Target user not found!")
             return {"error": "User not found."}
 
-        # Store timestamps of tweets
-        tweets_timestamp = []
+        # Tweets per day and the oldest timestamp, updated as tweets stream in
+        date_counts = Counter()
+        min_ts = None
         count = 0
         # Only fetch tweets from the last 180 days
-        cutoff_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=180)
+        # One clock read, so the cutoff and the reported end_date describe the same window
+        now_utc = datetime.datetime.now(datetime.timezone.utc)
+        cutoff_date = now_utc - datetime.timedelta(days=180)
 
         # Get first page of tweets
         print("[INFO] Fetching first page of tweets...")
-        tweets_page = await user.get_tweets(tweet_type="Tweets", count=50)
+        tweets_page = await _with_retry(lambda: user.get_tweets(tweet_type="Tweets", count=50))
 
         # Loop through tweet pages until max limit or cutoff date
-        while tweets_page and count < MAX_TWEETS:
-            for tweet in tweets_page:
-                # Convert tweet timestamp to UTC
-                ts = tweet.created_at_datetime.astimezone(datetime.timezone.utc)
-
-                # Stop if we reached older than cutoff date
-                if ts < cutoff_date:
-                    print("[INFO] Reached cutoff date. Stopping fetch.")
-                    tweets_page = None
-                    break
-
-                # Save timestamp
-                tweets_timestamp.append(ts)
-                count += 1
-
-                # Log progress every 50 tweets
-                if count % 50 == 0:
-                    print(f"[INFO] Fetched {count} tweets so far...")
-                if count >= MAX_TWEETS:
+        next_page_task = None
+        try:
+            while tweets_page and count < MAX_TWEETS:
+                # Start fetching the next page before processing this one, so the request is in
+                # flight meanwhile; the rate-limiter wait happens inside the task, so pacing is unchanged.
+                # Skipped when this page already ends the scrape, as the request would go out unused.
+                # More pages exist only while twikit hands back a cursor; an empty page ends the loop.
+                next_page_task = None
+                if tweets_page.next_cursor and not page_ends_scrape(tweets_page, count, cutoff_date):
+                    next_page_task = asyncio.create_task(fetch_next_page(tweets_page, _page_limiters[username]))
+                    # The loop below never awaits, so yield once to let the task send its request first
+                    await asyncio.sleep(0)
+
+                reached_end = False
+                for tweet in tweets_page:
+                    # Aware datetime; Twitter timestamps are already +0000, so .date() is the UTC day
+                    ts = tweet.created_at_datetime
+
+                    # Stop if we reached older than cutoff date
+                    if ts < cutoff_date:
+                        print("[INFO] Reached cutoff date. Stopping fetch.")
+                        reached_end = True
+                        break
+
+                    # Count tweet towards its day
+                    date_counts[ts.date()] += 1
+                    if min_ts is None or ts < min_ts:
+                        min_ts = ts
+                    count += 1
+
+                    # Log progress every 50 tweets
+                    if count % 50 == 0:
+                        print(f"[INFO] Fetched {count} tweets so far...")
+                    if count >= MAX_TWEETS:
+                        reached_end = True
+                        break
+
+                if next_page_task is None:
                     break
-
-            # If there’s a next page, wait random delay then fetch
-            if tweets_page and hasattr(tweets_page, "next") and tweets_page.next:
-                delay = random.uniform(*PAGE_DELAY_RANGE)
-                print(f"[INFO] Sleeping {delay:.2f}s before next page...")
-                await asyncio.sleep(delay)
-                tweets_page = await tweets_page.next()
-            else:
-                break
-
-        # Count tweets per day
-        date_counts = Counter([ts.date() for ts in tweets_timestamp])
+                if reached_end:
+                    break  # The prefetched page isn't needed; cancelled below
+                tweets_page = await next_page_task
+        finally:
+            # Don't leave a prefetch running against a client that may be dropped below,
+            # or a finished one with its exception never retrieved
+            if next_page_task is not None:
+                next_page_task.cancel()
+                await asyncio.gather(next_page_task, return_exceptions=True)
 
         # Collect user info
+        screen_name, name, profile, is_verified, created_at, default_image = _user_fields(user)
         user_info = {
-            "username": user.screen_name,
-            "name": user.name,
-            "profile": user.profile_image_url,
+            "username": screen_name,
+            "name": name,
+            "profile": profile,
             "tweet_count": count,
-            "is_verified": user.is_blue_verified,
-            "created_at": user.created_at_datetime.isoformat(),
-            "has_default_profile_image": user.default_profile_image,
-            "start_date": min(tweets_timestamp).isoformat() if tweets_timestamp else None,
-            "end_date": datetime.datetime.now(datetime.timezone.utc).isoformat()
+            "is_verified": is_verified,
+            "created_at": created_at.isoformat(),
+            "has_default_profile_image": default_image,
+            "start_date": min_ts.astimezone(datetime.timezone.utc).isoformat() if min_ts else None,
+            "end_date": now_utc.isoformat()
         }
 
-        print(f"[INFO] Scraping complete. Total tweets fetched: {len(tweets_timestamp)}")
+        print(f"[INFO] Scraping complete. Total tweets fetched: {count}")
         return {
             "user_info": user_info,
             "tweets_per_day": {str(date): c for date, c in date_counts.items()},
-            "total_tweets_fetched": len(tweets_timestamp)
+            "total_tweets_fetched": count
         }
 
     except Exception as e:
-        # If error occurs, mark account as failed
+        # If error occurs, drop the (possibly broken) session and mark account as failed
         print(f"[ERROR] Exception while scraping with {username}: {e}")
+        _client_pool.pop(username, None)
         mark_account_failed(username)
         return {"error": f"Unable to fetch tweets: {e}"}
 
 
+async def scrape_many(targets: list, max_concurrency: int = None):
+    """
+    Scrape several target usernames concurrently, at most max_concurrency at a time
+    (default: one per active account). Results are returned in target order; a
+    target whose scrape raised gets the exception in its slot.
+    """
+    if max_concurrency is None:
+        max_concurrency = max(1, len(get_active_accounts()))
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(target):
+        async with sem:
+            return await scrape_tweets(target)
+
+    return await asyncio.gather(*(_one(target) for target in targets), return_exceptions=True)
+
+
 # ---------------- Test Run ----------------
 if __name__ == "__main__":
     # Run test scrape for a single username
     target_user = "sakkshm"
     result = asyncio.run(scrape_tweets(target_user))
-    print("[RESULT]", json.dumps(result, indent=2, default=str))
+    print("[RESULT]", orjson.dumps(result, option=orjson.OPT_INDENT_2, default=str).decode())
@@ -0,0 +1,286 @@
+"""
+Scrape worker: runs jobs queued by the API server (main.py) in a separate process,
+so scraping/parsing gets its own event loop and GIL and a scraper crash can't take the API down.
+Run one or more alongside the API with `python worker.py`.
+"""
+import asyncio
+import os
+import signal
+import socket
+import time
+from datetime import datetime, timezone
+
+from aiolimiter import AsyncLimiter
+
+from common import (
+    WORKER_COUNT,
+    JOB_QUEUE_KEY,
+    PROCESSING_KEY_PREFIX,
+    create_http_client,
+    create_supabase_client,
+    create_redis_client,
+    pending_key,
+    processing_key,
+    worker_key,
+    set_job,
+)
+from utils.scrape_tweets import scrape_tweets
+
+# ---------------- Worker config ----------------
+SCRAPE_CONCURRENCY = int(os.getenv("SCRAPE_CONCURRENCY", WORKER_COUNT * 4))  # Max scrape jobs running at once per worker
+SCRAPE_RATE_PER_MINUTE = int(os.getenv("SCRAPE_RATE_PER_MINUTE", 12))  # Scrapes started per minute, kept under Twitter's limits
+FLUSH_INTERVAL = float(os.getenv("FLUSH_INTERVAL", 0.1))  # Max seconds a result waits for batch-mates before being written to DB
+FLUSH_RETRY_DELAY = 5  # Seconds to back off after a failed batch write
+FLUSH_BATCH = int(os.getenv("FLUSH_BATCH", 25))  # Flush early once this many results are buffered
+# Stable across restarts of the same worker (set WORKER_ID per replica) so it can reclaim its own jobs
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+HEARTBEAT_INTERVAL = 10  # Seconds between heartbeat refreshes / orphaned-job sweeps
+HEARTBEAT_TTL = 30  # Seconds without a heartbeat before a worker's jobs are handed to others
+
+supabase = None       # Created in main() inside the running event loop
+http_client = None    # Pooled HTTP client backing supabase; owned (and closed) here
+redis_client = None
+job_tasks = set()     # Running scrape job tasks, referenced here so they aren't garbage collected
+scrape_sem = asyncio.Semaphore(SCRAPE_CONCURRENCY)  # Bounds concurrently running scrape jobs
+scrape_limiter = AsyncLimiter(SCRAPE_RATE_PER_MINUTE, 60)  # Shared across jobs to self-pace scraping
+
+# ---------------- Batched DB Writes ----------------
+pending_upserts = {}          # Buffered tweet_results rows {username: row}, latest result per user wins
+flush_lock = asyncio.Lock()
+flush_event = asyncio.Event()       # Set when a result is buffered
+batch_full_event = asyncio.Event()  # Set when the buffer reaches FLUSH_BATCH
+
+def queue_upsert(username: str, result: dict):
+    """Buffer a scrape result for the next batched upsert."""
+    now = time.time()
+    pending_upserts[username] = {
+        "username": username,
+        "result": result,
+        "last_updated": datetime.fromtimestamp(now, timezone.utc).isoformat(),  # Only ISO string built, for the DB
+        "updated_at_ts": now
+    }
+    flush_event.set()
+    if len(pending_upserts) >= FLUSH_BATCH:
+        batch_full_event.set()
+
+async def flush_upserts() -> bool:
+    """
+    Write all buffered results to Supabase in a single upsert, then release their pending
+    markers so /fetch serves the saved rows from then on. Returns False if the write failed.
+    """
+    async with flush_lock:
+        if not pending_upserts:
+            return True
+        batch = list(pending_upserts.values())
+        pending_upserts.clear()
+        try:
+            await supabase.table("tweet_results").upsert(batch, on_conflict="username").execute()
+        except Exception as e:
+            print(f"[Flusher] Failed to save {len(batch)} results: {e}")
+            # Requeue rows that haven't been superseded by a newer result
+            for row in batch:
+                pending_upserts.setdefault(row["username"], row)
+            return False
+        try:
+            await redis_client.delete(*(pending_key(row["username"]) for row in batch))
+        except Exception as e:
+            print(f"[Flusher] Failed to clear pending markers: {e}")
+        return True
+
+async def upsert_flusher():
+    """
+    Micro-batch buffered results: once a result arrives, wait up to FLUSH_INTERVAL
+    for more (or until FLUSH_BATCH are waiting), then write them in one upsert.
+    Sleeps while the buffer is empty.
+    """
+    while True:
+        await flush_event.wait()
+        try:
+            await asyncio.wait_for(batch_full_event.wait(), timeout=FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        flush_event.clear()
+        batch_full_event.clear()
+        if not await flush_upserts():
+            flush_event.set()  # Retry the requeued rows after backing off
+            await asyncio.sleep(FLUSH_RETRY_DELAY)
+
+# ---------------- Job Recovery ----------------
+async def recover_orphaned_jobs(include_own: bool = False):
+    """
+    Move entries from processing lists of dead workers (no heartbeat) back onto the queue.
+    include_own also reclaims this worker's list, left over from a previous run of the same WORKER_ID.
+    """
+    async for key in redis_client.scan_iter(match=f"{PROCESSING_KEY_PREFIX}*"):
+        owner = key[len(PROCESSING_KEY_PREFIX):]
+        if owner == WORKER_ID:
+            if not include_own:
+                continue
+        elif await redis_client.exists(worker_key(owner)):
+            continue
+        # Dequeue end, so recovered jobs run before newer ones
+        while entry := await redis_client.lmove(key, JOB_QUEUE_KEY, "RIGHT", "RIGHT"):
+            print(f"[Recovery] Requeued {entry} from {owner}")
+
+async def heartbeat():
+    """Keep this worker's heartbeat alive and periodically requeue jobs of dead workers."""
+    while True:
+        try:
+            await redis_client.set(worker_key(WORKER_ID), 1, ex=HEARTBEAT_TTL)
+            await recover_orphaned_jobs()
+        except Exception as e:
+            print(f"[Heartbeat] Failed: {e}")
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+# ---------------- Job Dispatch ----------------
+async def run_job(job_id: str, username: str, entry: str):
+    """
+    Process a single scraping job:
+        - Calls scrape_tweets()
+        - Buffers result for the batched Supabase upsert
+        - Updates job status
+    Releases its scrape_sem slot when finished. If cancelled (worker shutting down),
+    the job goes back on the queue with its pending claim intact.
+    """
+    print(f"[Job {job_id}] Processing {username}")
+    saved = False
+    cancelled = False
+
+    try:
+        await set_job(redis_client, job_id, status="fetching")
+        async with scrape_limiter:
+            # Always scrape live: /fetch only queues a job once the saved row is stale, and the
+            # result is stamped as fresh when saved, so an on-disk cached result would be served as new
+            result = await scrape_tweets(username, cache_ttl=0)
+
+        if result.get("error"):
+            await set_job(redis_client, job_id, status="error", result={"error": result.get("error")})
+        else:
+            # Save result to Supabase (batched upsert); the flusher clears the pending marker once written
+            queue_upsert(username, result)
+            saved = True
+            await set_job(redis_client, job_id, status="done", result=result)
+
+    except asyncio.CancelledError:
+        cancelled = True
+        if not saved:
+            await requeue_job(job_id, entry)
+        raise
+
+    except Exception as e:
+        print(f"[Job {job_id}] Error: {e}")
+        try:
+            await set_job(redis_client, job_id, status="error", result={"error": str(e)})
+        except Exception as redis_error:
+            print(f"[Job {job_id}] Failed to record error: {redis_error}")
+
+    finally:
+        # A cancelled job's entry and claim were handed back by requeue_job (or, if that
+        # failed, stay on the processing list for recovery), so leave them alone
+        if not cancelled:
+            if not saved:
+                try:
+                    await redis_client.delete(pending_key(username))
+                except Exception as e:
+                    print(f"[Job {job_id}] Failed to clear pending marker: {e}")
+            try:
+                await redis_client.lrem(processing_key(WORKER_ID), 1, entry)
+            except Exception as e:
+                print(f"[Job {job_id}] Failed to clear processing entry: {e}")
+        scrape_sem.release()
+
+async def requeue_job(job_id: str, entry: str):
+    """Move an interrupted job from this worker's processing list back to the front of the queue."""
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.lrem(processing_key(WORKER_ID), 1, entry)
+            pipe.rpush(JOB_QUEUE_KEY, entry)
+            await pipe.execute()
+        await set_job(redis_client, job_id, status="queued")
+        print(f"[Job {job_id}] Interrupted, requeued")
+    except Exception as e:
+        print(f"[Job {job_id}] Failed to requeue, left for recovery: {e}")
+
+async def dispatcher():
+    """
+    Pull jobs off the Redis queue and run each as its own task.
+    BLMOVE atomically parks each entry on this worker's processing list, so a job
+    taken by a worker that dies is recovered instead of lost.
+    Scraping is I/O-bound, so a slow scrape no longer blocks a fixed worker;
+    scrape_sem caps how many run at once and leaves the rest queued.
+    """
+    while True:
+        await scrape_sem.acquire()
+        try:
+            entry = await redis_client.blmove(JOB_QUEUE_KEY, processing_key(WORKER_ID), 0, src="RIGHT", dest="LEFT")
+        except asyncio.CancelledError:
+            scrape_sem.release()
+            raise
+        except Exception as e:
+            print(f"[Dispatcher] Failed to read job queue: {e}")
+            scrape_sem.release()
+            await asyncio.sleep(1)
+            continue
+        job_id, username = entry.split("|", 1)
+        task = asyncio.create_task(run_job(job_id, username, entry))
+        job_tasks.add(task)
+        task.add_done_callback(job_tasks.discard)
+
+# ---------------- Entrypoint ----------------
+async def main():
+    """Run the dispatcher and flusher until SIGINT/SIGTERM, then shut down gracefully."""
+    global supabase, http_client, redis_client
+    http_client = create_http_client()
+    supabase = await create_supabase_client(http_client)
+    redis_client = create_redis_client()
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass  # Not supported on Windows event loops
+
+    # Announce ourselves before sweeping so other workers don't treat our list as orphaned
+    await redis_client.set(worker_key(WORKER_ID), 1, ex=HEARTBEAT_TTL)
+    await recover_orphaned_jobs(include_own=True)
+
+    worker_tasks = [
+        asyncio.create_task(dispatcher()),
+        asyncio.create_task(upsert_flusher()),
+        asyncio.create_task(heartbeat()),
+    ]
+    print(f"Started scrape worker {WORKER_ID} (max {SCRAPE_CONCURRENCY} concurrent scrapes)")
+    await stop.wait()
+
+    print("Shutting down gracefully...")
+    for task in [*worker_tasks, *job_tasks]:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await flush_upserts()  # Persist results still waiting in the buffer
+    try:
+        await redis_client.delete(worker_key(WORKER_ID))
+    except Exception:
+        pass
+    try:
+        await supabase.auth.sign_out()
+    except Exception:
+        pass
+    for session in (http_client, redis_client):
+        try:
+            await session.aclose()
+        except Exception:
+            pass
+    print("Shutdown complete.")
+
+if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(main())